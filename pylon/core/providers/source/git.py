@@ -17,8 +17,13 @@
 
 """ SourceProvider """
 
+import os
+import time
+import shutil
 import tempfile
+import concurrent.futures
 
+from pylon.core.tools import log
 from pylon.core.tools import git
 
 from . import SourceProviderModel
@@ -38,37 +43,134 @@ class Provider(SourceProviderModel):  # pylint: disable=R0902
         self.password = self.settings.get("password", None)
         self.key_filename = self.settings.get("key_filename", None)
         self.key_data = self.settings.get("key_data", None)
+        self.cache_path = self.settings.get("cache_path", None)
+        self.cache_max_entries = self.settings.get("cache_max_entries", 64)
+        self.max_workers = self.settings.get("max_workers", 8)
 
     def init(self):
         """ Initialize provider """
+        if self.cache_path is not None:
+            os.makedirs(self.cache_path, exist_ok=True)
 
     def deinit(self):
         """ De-initialize provider """
+        git.PooledParamikoSSHVendor.close_all()
 
     def get_source(self, target):
         """ Get plugin source """
         target_path = tempfile.mkdtemp()
         self.context.module_manager.temporary_objects.append(target_path)
         #
-        git.clone(
-            target.get("source"),
-            target_path,
-            target.get("branch", self.branch),
-            target.get("depth", self.depth),
-            target.get("delete_git_dir", self.delete_git_dir),
+        source = target.get("source")
+        branch = target.get("branch", self.branch)
+        delete_git_dir = target.get("delete_git_dir", self.delete_git_dir)
+        auth = (
             target.get("username", self.username),
             target.get("password", self.password),
             target.get("key_filename", self.key_filename),
             target.get("key_data", self.key_data),
         )
+        # Only plain work trees (without .git) are cached, keyed by commit
+        cache_path = None
+        if self.cache_path is not None and delete_git_dir:
+            try:
+                commit = git.resolve_commit(source, branch, *auth)
+            except:  # pylint: disable=W0702
+                log.exception("Could not resolve commit for %s (%s)", source, branch)
+                commit = None
+            #
+            if commit is not None:
+                cache_path = os.path.join(self.cache_path, commit)
+        #
+        if cache_path is not None and os.path.isdir(cache_path):
+            log.info("Using cached source for %s (%s)", source, branch)
+            try:
+                shutil.copytree(cache_path, target_path, dirs_exist_ok=True)
+            except:  # pylint: disable=W0702
+                log.exception("Could not use cached source for %s (%s)", source, branch)
+                shutil.rmtree(target_path, ignore_errors=True)
+                os.makedirs(target_path, exist_ok=True)
+            else:
+                try:
+                    os.utime(cache_path)  # mtime is used as last access time for pruning
+                except OSError:
+                    pass
+                return target_path
+        # Keep .git until checked out commit is known (if caching)
+        repository = git.clone(
+            source,
+            target_path,
+            branch,
+            target.get("depth", self.depth),
+            delete_git_dir and cache_path is None,
+            *auth,
+            temporary_objects=self.context.module_manager.temporary_objects,
+        )
+        #
+        if cache_path is not None:
+            try:
+                checked_out_commit = repository.head().decode("utf-8")
+            except:  # pylint: disable=W0702
+                checked_out_commit = None
+            #
+            git.remove_git_dir(target_path, self.context.module_manager.temporary_objects)
+            # Requested commit may be missing: clone() falls back to default branch then
+            if checked_out_commit == os.path.basename(cache_path):
+                self._add_to_cache(target_path, cache_path)
+            else:
+                log.warning(
+                    "Checked out commit %s differs from resolved %s, not caching %s (%s)",
+                    checked_out_commit, os.path.basename(cache_path), source, branch,
+                )
         #
         return target_path
 
-    def get_multiple_source(self, targets):
-        """ Get plugins source """
-        result = list()
+    def _add_to_cache(self, target_path, cache_path):
+        cache_tmp_path = tempfile.mkdtemp(dir=self.cache_path)
+        try:
+            shutil.copytree(target_path, cache_tmp_path, dirs_exist_ok=True)
+            os.rename(cache_tmp_path, cache_path)
+        except:  # pylint: disable=W0702
+            shutil.rmtree(cache_tmp_path, ignore_errors=True)
+            # Same commit may be cached concurrently (by other process)
+            if os.path.isdir(cache_path):
+                log.debug("Source is already cached: %s", cache_path)
+            else:
+                log.exception("Could not cache source: %s", cache_path)
+            return
         #
-        for target in targets:
-            result.append(self.get_source(target))
+        self._prune_cache()
+
+    def _prune_cache(self):
+        if not self.cache_max_entries:
+            return
         #
-        return result
+        try:
+            cache_entries = list()  # (last access time, path)
+            with os.scandir(self.cache_path) as cache_items:
+                for cache_item in cache_items:
+                    if git.is_commit_sha(cache_item.name) and cache_item.is_dir():
+                        cache_entries.append((cache_item.stat().st_mtime, cache_item.path))
+        except:  # pylint: disable=W0702
+            log.exception("Could not list source cache: %s", self.cache_path)
+            return
+        # Remove least recently used entries
+        cache_entries.sort(reverse=True)
+        for _, cache_entry_path in cache_entries[self.cache_max_entries:]:
+            # Rename first: partial entry is never visible under commit name
+            stale_path = f"{cache_entry_path}.del.{os.getpid()}.{time.time_ns()}"
+            try:
+                os.rename(cache_entry_path, stale_path)
+            except OSError:
+                continue  # already removed (by other process)
+            shutil.rmtree(stale_path, ignore_errors=True)
+
+    def get_multiple_source(self, targets):
+        """ Get plugins source """
+        if not targets:
+            return list()
+        # Clones are network-bound: get sources concurrently (order is kept)
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(targets)),
+        ) as executor:
+            return list(executor.map(self.get_source, targets))
@@ -48,6 +48,21 @@ def config_substitution(obj, secrets):
     return obj
 
 
+def config_has_markers(obj, markers=("$!", "$=")):
+    """ Check if YAML/JSON config has values that config_substitution can replace """
+    pending = [obj]
+    while pending:
+        item = pending.pop()
+        if isinstance(item, dict):
+            pending.extend(item.keys())
+            pending.extend(item.values())
+        elif isinstance(item, list):
+            pending.extend(item)
+        elif isinstance(item, str) and item.strip().startswith(markers):
+            return True
+    return False
+
+
 def vault_secrets(settings):
     """ Get secrets from HashiCorp Vault """
     if "vault" not in settings:
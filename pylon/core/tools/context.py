@@ -21,17 +21,11 @@
 class Context:
     """ Application context holder """
 
-    def __init__(self):
-        self.__dict__["_context"] = dict()
+    # Values are kept in instance __dict__: present names are resolved by regular
+    # attribute lookup, __getattr__ is only called for missing ones
 
     def __getattr__(self, name):
-        if name not in self._context:
-            raise AttributeError(f"{name} not present in current context")
-        return self._context[name]
-
-    def __setattr__(self, name, value):
-        self._context[name] = value
+        raise AttributeError(f"{name} not present in current context")
 
     def __delattr__(self, name):
-        if name in self._context:
-            del self._context[name]
+        self.__dict__.pop(name, None)
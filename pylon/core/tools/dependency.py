@@ -62,3 +62,45 @@ def _walk_module_depencies(module_name, module_map, module_order, visited_module
             _walk_module_depencies(dependency, module_map, module_order, visited_modules)
     # Add to resolved order
     module_order.append(module_name)
+
+
+def resolve_depencies_levels(module_map):
+    """ Resolve depencies into levels (modules in level depend only on previous levels) """
+    # Collect depencies present in map
+    module_depencies = dict()
+    module_dependents = {module_name: list() for module_name in module_map}
+    for module_name, module_data in module_map.items():
+        module_depencies[module_name] = set()
+        for dependency in \
+                module_data[0].get("depends_on", list()) + module_data[0].get("init_after", list()):
+            if dependency in module_map:
+                module_depencies[module_name].add(dependency)
+        for dependency in module_depencies[module_name]:
+            module_dependents[dependency].append(module_name)
+    # Kahn: each round takes all modules without unresolved depencies
+    in_degree = {
+        module_name: len(depencies) for module_name, depencies in module_depencies.items()
+    }
+    module_levels = list()
+    module_level = [module_name for module_name in module_map if not in_degree[module_name]]
+    resolved_modules = 0
+    while module_level:
+        module_levels.append(module_level)
+        resolved_modules += len(module_level)
+        #
+        next_level = list()
+        for module_name in module_level:
+            for dependent in module_dependents[module_name]:
+                in_degree[dependent] -= 1
+                if not in_degree[dependent]:
+                    next_level.append(dependent)
+        module_level = next_level
+    #
+    if resolved_modules != len(module_map):
+        log.error(
+            "Circular dependency present in: %s",
+            ", ".join(module_name for module_name in module_map if in_degree[module_name]),
+        )
+        raise RuntimeError("Circular dependency present")
+    # Return levels
+    return module_levels
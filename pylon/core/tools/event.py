@@ -18,6 +18,7 @@
 """ Core events """
 
 import ssl
+import time
 import functools
 
 import arbiter  # pylint: disable=E0401
@@ -35,38 +36,40 @@ class EventManager:
         events_redis = self.context.settings.get("events", dict()).get("redis", dict())
         #
         if events_rabbitmq:
-            try:
-                ssl_context=None
-                ssl_server_hostname=None
-                #
-                if events_rabbitmq.get("use_ssl", False):
-                    ssl_context = ssl.create_default_context()
-                    if events_rabbitmq.get("ssl_verify", False) is True:
-                        ssl_context.verify_mode = ssl.CERT_REQUIRED
-                        ssl_context.check_hostname = True
-                        ssl_context.load_default_certs()
-                    else:
-                        ssl_context.check_hostname = False
-                        ssl_context.verify_mode = ssl.CERT_NONE
-                    ssl_server_hostname = events_rabbitmq.get("host")
+            hosts = events_rabbitmq.get("hosts", [events_rabbitmq.get("host")])
+            connect_retries = events_rabbitmq.get("connect_retries", 1)
+            connect_retry_delay = events_rabbitmq.get("connect_retry_delay", 1.0)
+            #
+            self.node = None
+            #
+            for host in hosts:
+                for attempt in range(connect_retries):
+                    node = None
+                    try:
+                        node = self._make_rabbitmq_node(events_rabbitmq, host)
+                        node.start()
+                        self.node = node
+                        break
+                    except:  # pylint: disable=W0702
+                        log.exception(
+                            "Cannot make EventNode instance for %s (attempt %s of %s)",
+                            host, attempt + 1, connect_retries,
+                        )
+                        # Stop threads that failed node may have started
+                        if node is not None:
+                            try:
+                                node.stop()
+                            except:  # pylint: disable=W0702
+                                pass
+                        #
+                        if attempt < connect_retries - 1:
+                            time.sleep(connect_retry_delay * 2 ** attempt)
                 #
-                self.node = arbiter.EventNode(
-                    host=events_rabbitmq.get("host"),
-                    port=events_rabbitmq.get("port", 5672),
-                    user=events_rabbitmq.get("user", ""),
-                    password=events_rabbitmq.get("password", ""),
-                    vhost=events_rabbitmq.get("vhost", "carrier"),
-                    event_queue=events_rabbitmq.get("queue", "events"),
-                    hmac_key=events_rabbitmq.get("hmac_key", None),
-                    hmac_digest=events_rabbitmq.get("hmac_digest", "sha512"),
-                    callback_workers=events_rabbitmq.get("callback_workers", 1),
-                    ssl_context=ssl_context,
-                    ssl_server_hostname=ssl_server_hostname,
-                    mute_first_failed_connections=events_rabbitmq.get("mute_first_failed_connections", 10),  # pylint: disable=C0301
-                )
-                self.node.start()
-            except:  # pylint: disable=W0702
-                log.exception("Cannot make EventNode instance, using local events only")
+                if self.node is not None:
+                    break
+            #
+            if self.node is None:
+                log.error("Cannot make EventNode instance, using local events only")
                 self.node = arbiter.MockEventNode()
         elif events_redis:
             try:
@@ -90,6 +93,38 @@ class EventManager:
         #
         self.partials = dict()
 
+    @staticmethod
+    def _make_rabbitmq_node(events_rabbitmq, host):
+        """ Make RabbitMQ EventNode for specific host """
+        ssl_context=None
+        ssl_server_hostname=None
+        #
+        if events_rabbitmq.get("use_ssl", False):
+            ssl_context = ssl.create_default_context()
+            if events_rabbitmq.get("ssl_verify", False) is True:
+                ssl_context.verify_mode = ssl.CERT_REQUIRED
+                ssl_context.check_hostname = True
+                ssl_context.load_default_certs()
+            else:
+                ssl_context.check_hostname = False
+                ssl_context.verify_mode = ssl.CERT_NONE
+            ssl_server_hostname = host
+        #
+        return arbiter.EventNode(
+            host=host,
+            port=events_rabbitmq.get("port", 5672),
+            user=events_rabbitmq.get("user", ""),
+            password=events_rabbitmq.get("password", ""),
+            vhost=events_rabbitmq.get("vhost", "carrier"),
+            event_queue=events_rabbitmq.get("queue", "events"),
+            hmac_key=events_rabbitmq.get("hmac_key", None),
+            hmac_digest=events_rabbitmq.get("hmac_digest", "sha512"),
+            callback_workers=events_rabbitmq.get("callback_workers", 1),
+            ssl_context=ssl_context,
+            ssl_server_hostname=ssl_server_hostname,
+            mute_first_failed_connections=events_rabbitmq.get("mute_first_failed_connections", 10),  # pylint: disable=C0301
+        )
+
     def register_listener(self, event, listener):
         """ Register event listener """
         if listener not in self.partials:
@@ -22,14 +22,18 @@
 
 import io
 import os
+import time
 import shutil
 import getpass
+import functools
+import threading
 
 import dulwich  # pylint: disable=E0401
 from dulwich import refs, repo, porcelain, client, file  # pylint: disable=E0401
 from dulwich.contrib.paramiko_vendor import ParamikoSSHVendor  # pylint: disable=E0401
 
 import paramiko  # pylint: disable=E0401
+import paramiko.client  # pylint: disable=E0401
 import paramiko.transport  # pylint: disable=E0401
 from paramiko import SSHException, Message  # pylint: disable=E0401
 
@@ -38,6 +42,9 @@ from pylon.core.tools import log
 
 def apply_patches():
     """ Patch dulwich and paramiko """
+    # Patch only once
+    if getattr(paramiko.transport.Transport._verify_key, "_pylon_patched", False):  # pylint: disable=W0212
+        return
     # Set USERNAME if needed
     try:
         getpass.getuser()
@@ -45,9 +52,10 @@ def apply_patches():
         os.environ["USERNAME"] = "git"
     # Patch dulwich to work without valid UID/GID
     repo._get_default_identity = patched_repo_get_default_identity(repo._get_default_identity)  # pylint: disable=W0212
-    # Patch dulwich to use paramiko SSH client
-    client.get_ssh_vendor = ParamikoSSHVendor
+    # Patch dulwich to use paramiko SSH client (with connection reuse)
+    client.get_ssh_vendor = PooledParamikoSSHVendor
     # Patch paramiko to skip key verification
+    patched_paramiko_transport_verify_key._pylon_patched = True  # pylint: disable=W0212
     paramiko.transport.Transport._verify_key = patched_paramiko_transport_verify_key  # pylint: disable=W0212
     # Patch paramiko to support direct pkey usage
     paramiko.client.SSHClient._auth = patched_paramiko_client_SSHClient_auth(paramiko.client.SSHClient._auth)  # pylint: disable=C0301,W0212
@@ -55,6 +63,170 @@ def apply_patches():
     dulwich.client.HttpGitClient.from_parsedurl = patched_dulwich_client_HttpGitClient_from_parsedurl(dulwich.client.HttpGitClient.from_parsedurl)  # pylint: disable=C0301,W0212
 
 
+class PooledParamikoSSHVendor(ParamikoSSHVendor):
+    """ Paramiko SSH vendor: reuse connected SSH clients for new commands """
+
+    idle_clients = dict()  # (host, port, username, password, key) -> [SSHClient]
+    idle_clients_lock = threading.Lock()
+    max_idle_clients = 4  # per client key
+
+    def run_command(  # pylint: disable=R0913
+            self, host, command,
+            username=None, port=None, password=None, pkey=None, key_filename=None,
+            **kwargs
+    ):
+        """ Run command on (pooled) SSH connection """
+        if kwargs:
+            return super().run_command(
+                host, command, username, port, password, pkey, key_filename, **kwargs
+            )
+        #
+        client_key = (
+            host, port, username, password, ssh_key_id(pkey), ssh_key_id(key_filename),
+        )
+        # Reuse idle client: it is checked out of pool until channel is closed
+        while True:
+            with self.idle_clients_lock:
+                clients = self.idle_clients.get(client_key, None)
+                ssh_client = clients.pop() if clients else None
+            #
+            if ssh_client is None:
+                break
+            #
+            try:
+                channel = open_ssh_channel(ssh_client, command)
+            except:  # pylint: disable=W0702
+                log.debug("Pooled SSH connection to %s failed, reconnecting", host)
+                ssh_client.close()
+                continue
+            #
+            return PooledParamikoChannel(client_key, ssh_client, channel)
+        # Make new client
+        connection_kwargs = {"hostname": host}
+        connection_kwargs.update(self.kwargs)
+        if username:
+            connection_kwargs["username"] = username
+        if port:
+            connection_kwargs["port"] = port
+        if password:
+            connection_kwargs["password"] = password
+        if pkey:
+            connection_kwargs["pkey"] = pkey
+        if key_filename:
+            connection_kwargs["key_filename"] = key_filename
+        #
+        ssh_client = paramiko.SSHClient()
+        ssh_client.set_missing_host_key_policy(paramiko.client.MissingHostKeyPolicy())
+        #
+        try:
+            ssh_client.connect(**connection_kwargs)
+            ssh_client.get_transport().set_keepalive(30)
+            channel = open_ssh_channel(ssh_client, command)
+        except:  # pylint: disable=W0702
+            ssh_client.close()
+            raise
+        #
+        return PooledParamikoChannel(client_key, ssh_client, channel)
+
+    @classmethod
+    def release_client(cls, client_key, ssh_client):
+        """ Return client to pool (or close it if not usable or pool is full) """
+        transport = ssh_client.get_transport()
+        if transport is not None and transport.is_active():
+            with cls.idle_clients_lock:
+                clients = cls.idle_clients.setdefault(client_key, list())
+                if len(clients) < cls.max_idle_clients:
+                    clients.append(ssh_client)
+                    return
+        #
+        ssh_client.close()
+
+    @classmethod
+    def close_all(cls):
+        """ Close all idle pooled clients """
+        with cls.idle_clients_lock:
+            clients = [item for items in cls.idle_clients.values() for item in items]
+            cls.idle_clients.clear()
+        #
+        for ssh_client in clients:
+            try:
+                ssh_client.close()
+            except:  # pylint: disable=W0702
+                pass
+
+
+class PooledParamikoChannel:
+    """ Command channel on pooled SSH client (dulwich SSH vendor connection) """
+
+    def __init__(self, client_key, ssh_client, channel):
+        self.client_key = client_key
+        self.ssh_client = ssh_client
+        self.channel = channel
+        self.closed = False
+        # Channel must block
+        self.channel.setblocking(True)
+
+    @property
+    def stderr(self):
+        """ Get stderr stream """
+        return self.channel.makefile_stderr("rb")
+
+    def can_read(self):
+        """ Check if data is available """
+        return self.channel.recv_ready()
+
+    def write(self, data):
+        """ Send data """
+        return self.channel.sendall(data)
+
+    def read(self, n=None):
+        """ Read data (n bytes, unless channel is closed) """
+        data = self.channel.recv(n)
+        if not data or not n:
+            return data
+        #
+        chunks = [data]
+        data_len = len(data)
+        while data_len < n:
+            data = self.channel.recv(n - data_len)
+            if not data:
+                break
+            chunks.append(data)
+            data_len += len(data)
+        #
+        return b"".join(chunks)
+
+    def close(self):
+        """ Close channel and return client to pool """
+        if self.closed:
+            return
+        self.closed = True
+        #
+        self.channel.close()
+        PooledParamikoSSHVendor.release_client(self.client_key, self.ssh_client)
+
+
+def open_ssh_channel(ssh_client, command):
+    """ Open session on connected SSH client and run command """
+    transport = ssh_client.get_transport()
+    if transport is None or not transport.is_active():
+        raise SSHException("SSH transport is not active")
+    #
+    channel = transport.open_session()
+    channel.exec_command(command)
+    #
+    return channel
+
+
+def ssh_key_id(key):
+    """ Get hashable identity of SSH key (or key filename) """
+    if isinstance(key, paramiko.PKey):
+        return key.get_fingerprint()
+    if isinstance(key, list):
+        return tuple(ssh_key_id(item) for item in key)
+    return key
+
+
 def patched_repo_get_default_identity(original_repo_get_default_identity):
     """ Allow to run without valid identity """
     def patched_function():
@@ -108,42 +280,23 @@ def patched_dulwich_client_HttpGitClient_from_parsedurl(original_from_parsedurl)
 
 def patched_paramiko_client_SSHClient_auth(original_auth):  # pylint: disable=C0103
     """ Allow to pass prepared pkey in key_filename(s) """
-    def patched_function(  # pylint: disable=R0913
-            self, username, password, pkey, key_filenames, allow_agent, look_for_keys,  # pylint: disable=W0613
-            gss_auth, gss_kex, gss_deleg_creds, gss_host, passphrase,
-    ):
-        if isinstance(key_filenames, list) and len(key_filenames) == 1 and \
-                isinstance(key_filenames[0], paramiko.RSAKey):
-            target_pkey = key_filenames[0]
-            target_key_filenames = list()
-            return original_auth(
-                self,
-                username, password, target_pkey, target_key_filenames, allow_agent, look_for_keys,
-                gss_auth, gss_kex, gss_deleg_creds, gss_host, passphrase,
-            )
+    def patched_function(self, username, password, pkey, key_filenames, *args):
         if isinstance(key_filenames, paramiko.RSAKey):
-            target_pkey = key_filenames
-            target_key_filenames = list()
-            return original_auth(
-                self,
-                username, password, target_pkey, target_key_filenames, allow_agent, look_for_keys,
-                gss_auth, gss_kex, gss_deleg_creds, gss_host, passphrase,
-            )
-        return original_auth(
-            self,
-            username, password, pkey, key_filenames, allow_agent, look_for_keys,
-            gss_auth, gss_kex, gss_deleg_creds, gss_host, passphrase,
-        )
+            pkey, key_filenames = key_filenames, list()
+        elif isinstance(key_filenames, list) and len(key_filenames) == 1 and \
+                isinstance(key_filenames[0], paramiko.RSAKey):
+            pkey, key_filenames = key_filenames[0], list()
+        return original_auth(self, username, password, pkey, key_filenames, *args)
     return patched_function
 
 
-def clone(  # pylint: disable=R0913,R0912,R0914,R0915
-        source, target, branch="main", depth=None, delete_git_dir=False,
-        username=None, password=None, key_filename=None, key_data=None,
-        track_branch_upstream=True,
-):
-    """ Clone repository """
-    # Prepare auth args
+def is_commit_sha(value):
+    """ Check if value looks like a full commit SHA1 """
+    return len(value) == 40 and all(char in "0123456789abcdef" for char in value.lower())
+
+
+def make_auth_args(username=None, password=None, key_filename=None, key_data=None):
+    """ Make dulwich client auth args """
     auth_args = dict()
     if username is not None:
         auth_args["username"] = username
@@ -152,9 +305,47 @@ def clone(  # pylint: disable=R0913,R0912,R0914,R0915
     if key_filename is not None:
         auth_args["key_filename"] = key_filename
     if key_data is not None:
-        key_obj = io.StringIO(key_data.replace("|", "\n"))
-        pkey = paramiko.RSAKey.from_private_key(key_obj)
-        auth_args["key_filename"] = pkey
+        auth_args["key_filename"] = load_rsa_key(key_data)
+    return auth_args
+
+
+@functools.lru_cache(maxsize=16)
+def load_rsa_key(key_data):
+    """ Load RSA private key from key_data ('|' used as line separator) """
+    return paramiko.RSAKey.from_private_key(io.StringIO(key_data.replace("|", "\n")))
+
+
+def resolve_commit(  # pylint: disable=R0913
+        source, branch="main",
+        username=None, password=None, key_filename=None, key_data=None,
+):
+    """ Get commit SHA1 that clone() would check out (without fetching a pack) """
+    if is_commit_sha(branch):
+        return branch.lower()
+    #
+    auth_args = make_auth_args(username, password, key_filename, key_data)
+    git_client, path = client.get_transport_and_path(source, **auth_args)
+    remote_refs = git_client.get_refs(path)
+    #
+    for ref in [b"refs/heads/" + branch.encode("utf-8"), b"HEAD"]:
+        if ref in remote_refs:
+            return remote_refs[ref].decode("utf-8")
+    #
+    return None
+
+
+def clone(  # pylint: disable=R0913,R0912,R0914,R0915
+        source, target, branch="main", depth=1, delete_git_dir=False,
+        username=None, password=None, key_filename=None, key_data=None,
+        track_branch_upstream=True, temporary_objects=None,
+):
+    """ Clone repository """
+    # Prepare auth args
+    auth_args = make_auth_args(username, password, key_filename, key_data)
+    # Commit (SHA1) may be absent from shallow pack: fetch full history for it
+    if depth is not None and is_commit_sha(branch):
+        log.info("Branch %s looks like a commit, cloning full history", branch)
+        depth = None
     # Clone repository
     log.info("Cloning repository %s into %s", source, target)
     repository = porcelain.clone(
@@ -162,29 +353,32 @@ def clone(  # pylint: disable=R0913,R0912,R0914,R0915
         errstream=log.DebugLogStream(),
         **auth_args
     )
-    # Get current HEAD tree (default branch)
-    try:
-        head_tree = repository[b"HEAD"]
-    except:  # pylint: disable=W0702
-        head_tree = None
-    # Get target tree (requested branch)
+    # Read all refs once
+    all_refs = repository.get_refs()
     branch_b = branch.encode("utf-8")
-    try:
-        target_tree = repository[b"refs/remotes/origin/" + branch_b]
-    except:  # pylint: disable=W0702
-        target_tree = None
-    # Get commit tree (if branch is a SHA1)
-    try:
+    # Get commit tree (if branch is a SHA1: no ref lookups are needed then)
+    commit_tree = None
+    if is_commit_sha(branch) and branch_b in repository.object_store:
         commit_tree = repository[branch_b]
-    except:  # pylint: disable=W0702
-        commit_tree = None
+    # Get target tree (requested branch)
+    target_tree = None
+    if commit_tree is None:
+        target_ref = all_refs.get(b"refs/remotes/origin/" + branch_b, None)
+        if target_ref is not None:
+            target_tree = repository[target_ref]
+    # Get current HEAD tree (default branch)
+    head_tree = None
+    if commit_tree is None and target_tree is None:
+        head_ref = all_refs.get(b"HEAD", None)
+        if head_ref is not None:
+            head_tree = repository[head_ref]
     # Checkout branch
     branch_to_track = None
     if target_tree is not None:
         log.info("Checking out branch %s", branch)
-        repository[b"refs/heads/" + branch_b] = repository[b"refs/remotes/origin/" + branch_b]
+        repository.refs[b"refs/heads/" + branch_b] = target_tree.id
         repository.refs.set_symbolic_ref(b"HEAD", b"refs/heads/" + branch_b)
-        repository.reset_index(repository[b"HEAD"].tree)
+        repository.reset_index(target_tree.tree)
         #
         branch_to_track = branch
     elif commit_tree is not None:
@@ -222,26 +416,48 @@ def clone(  # pylint: disable=R0913,R0912,R0914,R0915
         except:  # pylint: disable=W0702
             log.exception("Failed to checkout default branch")
     else:
-        log.error("Branch %s was not found and default branch is not set. Skipping checkout")
+        log.error("Branch %s was not found and default branch is not set. Skipping checkout", branch)
     # Add remote tracking
-    if track_branch_upstream and branch_to_track is not None:
+    if track_branch_upstream and branch_to_track is not None and not delete_git_dir:
         log.info("Setting '%s' to track upstream branch", branch_to_track)
         #
         branch_to_track_b = branch_to_track.encode("utf-8")
         #
         config = repository.get_config()
-        config.set(
-            (b"branch", branch_to_track_b),
-            b"remote", b"origin",
-        )
-        config.set(
-            (b"branch", branch_to_track_b),
-            b"merge", b"refs/heads/" + branch_to_track_b,
-        )
-        config.write_to_path()
+        if not config.has_section((b"branch", branch_to_track_b)):
+            # Append section as is, no need to re-serialize whole config
+            config_path = os.path.join(repository.controldir(), "config")
+            with open(config_path, "ab") as config_file:
+                config_file.write(
+                    b'[branch "' + branch_to_track_b + b'"]\n'
+                    b"\tremote = origin\n"
+                    b"\tmerge = refs/heads/" + branch_to_track_b + b"\n"
+                )
     # Delete .git if requested
     if delete_git_dir:
         log.info("Deleting .git directory")
-        shutil.rmtree(os.path.join(target, ".git"))
+        remove_git_dir(target, temporary_objects)
     # Return repo object
     return repository
+
+
+def remove_git_dir(target, temporary_objects=None):
+    """ Remove .git directory from work tree (in background if possible) """
+    git_dir = os.path.join(target, ".git")
+    # Move .git out of the work tree and remove it in background
+    git_dir_to_delete = f"{os.path.normpath(target)}.git-del.{os.getpid()}.{time.time_ns()}"
+    try:
+        os.rename(git_dir, git_dir_to_delete)
+    except OSError:
+        # Parent is on other filesystem or is not writable: remove in place
+        shutil.rmtree(git_dir)
+        return
+    # Leftovers are removed with other temporary objects (if thread is not done on exit)
+    if temporary_objects is not None:
+        temporary_objects.append(git_dir_to_delete)
+    #
+    threading.Thread(
+        target=shutil.rmtree, args=(git_dir_to_delete,),
+        kwargs={"ignore_errors": True}, daemon=True,
+    ).start()
+
@@ -20,17 +20,25 @@
 """
 
 import io
+import sys
 import logging
-import inspect
 import urllib3  # pylint: disable=E0401
-import requests  # pylint: disable=E0401
 
 from pylon.core import constants
 from pylon.core.tools import env
 
+loggers_cache = dict()  # module name -> logger  # pylint: disable=C0103
+init_done = False  # pylint: disable=C0103
+
 
 def init(level=logging.INFO):
     """ Initialize logging """
+    global init_done  # pylint: disable=W0603,C0103
+    # Already initialized: only update level
+    if init_done:
+        logging.getLogger().setLevel(level)
+        return
+    #
     logging.basicConfig(
         level=level,
         datefmt=constants.LOG_DATE_FORMAT,
@@ -41,30 +49,35 @@ def init(level=logging.INFO):
     logging.getLogger("requests").setLevel(logging.WARNING)
     logging.getLogger("urllib3").setLevel(logging.WARNING)
     # Disable SSL warnings
-    urllib3.disable_warnings()
-    requests.packages.urllib3.disable_warnings()  # pylint: disable=E1101
+    urllib3.disable_warnings()  # requests.packages.urllib3 is urllib3
     # Disable additional logging
     logging.getLogger("pika").setLevel(logging.WARNING)
     logging.getLogger("paramiko.hostkeys").setLevel(logging.WARNING)
+    #
+    init_done = True
 
 
 def get_logger():
     """ Get logger for caller context """
     return logging.getLogger(
-        inspect.currentframe().f_back.f_globals["__name__"]
+        sys._getframe(1).f_globals["__name__"]  # pylint: disable=W0212
     )
 
 
 def get_outer_logger():
     """ Get logger for callers context (for use in this module) """
-    return logging.getLogger(
-        inspect.currentframe().f_back.f_back.f_globals["__name__"]
-    )
+    name = sys._getframe(2).f_globals["__name__"]  # pylint: disable=W0212
+    if name not in loggers_cache:
+        loggers_cache[name] = logging.getLogger(name)
+    return loggers_cache[name]
 
 
 def debug(msg, *args, **kwargs):
     """ Logs a message with level DEBUG """
-    return get_outer_logger().debug(msg, *args, **kwargs)
+    logger = get_outer_logger()
+    if not logger.isEnabledFor(logging.DEBUG):
+        return None
+    return logger.debug(msg, *args, **kwargs)
 
 
 def info(msg, *args, **kwargs):
@@ -110,6 +123,11 @@ def enable_logging():
 class DebugLogStream(io.RawIOBase):
     """ IO stream that writes to log.debug """
 
+    def __init__(self):
+        super().__init__()
+        self._line_buffer = bytearray()
+        self._logger = None
+
     def read(self, size=-1):  # pylint: disable=W0613
         return None
 
@@ -120,5 +138,31 @@ class DebugLogStream(io.RawIOBase):
         return None
 
     def write(self, b):
-        for line in b.decode().splitlines():
-            get_outer_logger().debug(line)
+        logger = get_outer_logger()
+        if not logger.isEnabledFor(logging.DEBUG):
+            return len(b)
+        self._logger = logger
+        # Buffer partial lines, log only complete ones (progress uses \r)
+        self._line_buffer.extend(b)
+        line_end = max(self._line_buffer.rfind(b"\n"), self._line_buffer.rfind(b"\r"))
+        if line_end < 0:
+            return len(b)
+        #
+        data = self._line_buffer[:line_end + 1]
+        del self._line_buffer[:line_end + 1]
+        #
+        for line in data.decode(errors="replace").splitlines():
+            if line:
+                logger.debug(line)
+        #
+        return len(b)
+
+    def flush(self):
+        # Log trailing partial line (also called on close)
+        if self._line_buffer and self._logger is not None:
+            line = self._line_buffer.decode(errors="replace").strip()
+            self._line_buffer.clear()
+            if line:
+                self._logger.debug(line)
+        #
+        super().flush()
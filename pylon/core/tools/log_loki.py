@@ -101,7 +101,7 @@ class CarrierLokiLogEmitter:  # pylint: disable=R0902
         """ Emit log line """
         labels = self.default_labels
         if additional_labels is not None:
-            labels.update(additional_labels)
+            labels = {**labels, **additional_labels}
         #
         data = {
             "streams": [
@@ -120,7 +120,7 @@ class CarrierLokiLogEmitter:  # pylint: disable=R0902
         """ Emit log line """
         labels = self.default_labels
         if additional_labels is not None:
-            labels.update(additional_labels)
+            labels = {**labels, **additional_labels}
         #
         data = {
             "streams": [
@@ -143,7 +143,7 @@ class CarrierLokiLogHandler(logging.Handler):
         super().__init__()
         self.settings = context.settings.get("loki")
         #
-        default_loki_labels = self.settings.get("labels", dict())
+        default_loki_labels = {**self.settings.get("labels", dict())}
         if self.settings.get("include_node_name", True):
             default_loki_labels["node"] = context.node_name
         #
@@ -191,7 +191,7 @@ class CarrierLokiBufferedLogHandler(logging.handlers.BufferingHandler):
         )
         self.settings = context.settings.get("loki")
         #
-        default_loki_labels = self.settings.get("labels", dict())
+        default_loki_labels = {**self.settings.get("labels", dict())}
         if self.settings.get("include_node_name", True):
             default_loki_labels["node"] = context.node_name
         #
@@ -226,8 +226,8 @@ class CarrierLokiBufferedLogHandler(logging.handlers.BufferingHandler):
         log_records = list()
         #
         try:
-            while self.buffer:
-                record = self.buffer.pop(0)
+            buffered_records, self.buffer = self.buffer, list()
+            for record in buffered_records:
                 record_ts = int(record.created * 1000000000)
                 record_data = self.format(record)
                 # TODO: batches with different stream labels (a.k.a. multiple streams support)
@@ -45,5 +45,9 @@ def enable_syslog_logging(context):
         socktype=socktype,
     )
     #
-    handler.setFormatter(logging.getLogger("").handlers[0].formatter)
-    logging.getLogger("").addHandler(handler)
+    root_logger = logging.getLogger("")
+    if root_logger.handlers:
+        handler.setFormatter(root_logger.handlers[0].formatter)
+    else:
+        handler.setFormatter(logging.Formatter())
+    root_logger.addHandler(handler)
@@ -22,29 +22,101 @@ import ctypes
 import base64
 import json
 import binascii
+import threading
+import concurrent.futures
 import requests  # pylint: disable=E0401
 import minio  # pylint: disable=E0401
 
+try:
+    from orjson import loads as json_loads  # pylint: disable=E0401,E0611
+except ModuleNotFoundError:
+    from json import loads as json_loads
+
+
+ADMIN_API_PATHS = [
+    "/list-users",
+    "/add-user",
+    "/remove-user",
+    "/set-user-status",
+    "/user-info",
+    "/update-group-members",
+    "/group",
+    "/groups",
+    "/set-group-status",
+    "/info-canned-policy",
+    "/list-canned-policies",
+    "/remove-canned-policy",
+    "/add-canned-policy",
+    "/set-user-or-group-policy",
+    "/config",
+]
+
+BOOL_STR = {True: "true", False: "false"}
+
 
 class MinIOAdminCrypt:
     """ MinIO admin encryption helper """
 
+    lib = None  # Shared library is loaded once per process
+    lib_lock = threading.Lock()
+
     def __init__(self, secret_key):
         self.key = secret_key
-        self.lib = ctypes.cdll.LoadLibrary(
-            os.path.join(os.path.dirname(__file__), "minio_madmin.so")
-        )
-        self.lib.decrypt.argtypes = [ctypes.c_char_p, ctypes.c_char_p]
-        self.lib.decrypt.restype = ctypes.c_char_p
-        self.lib.encrypt.argtypes = [ctypes.c_char_p, ctypes.c_char_p]
-        self.lib.encrypt.restype = ctypes.c_char_p
+        self.lib = self.load_library()
+        # Raw (non-hex) API is only present in newer library builds
+        self.raw_api = hasattr(self.lib, "encrypt2") and hasattr(self.lib, "decrypt2")
+
+    @classmethod
+    def load_library(cls):
+        """ Load and set up minio_madmin.so (once) """
+        with cls.lib_lock:
+            if cls.lib is not None:
+                return cls.lib
+            #
+            lib = ctypes.cdll.LoadLibrary(
+                os.path.join(os.path.dirname(__file__), "minio_madmin.so")
+            )
+            lib.decrypt.argtypes = [ctypes.c_char_p, ctypes.c_char_p]
+            lib.decrypt.restype = ctypes.c_char_p
+            lib.encrypt.argtypes = [ctypes.c_char_p, ctypes.c_char_p]
+            lib.encrypt.restype = ctypes.c_char_p
+            #
+            if hasattr(lib, "encrypt2") and hasattr(lib, "decrypt2"):
+                for func in [lib.encrypt2, lib.decrypt2]:
+                    func.argtypes = [
+                        ctypes.c_char_p, ctypes.c_char_p, ctypes.c_size_t,
+                        ctypes.c_char_p, ctypes.POINTER(ctypes.c_size_t),
+                    ]
+                    func.restype = ctypes.c_int
+            #
+            cls.lib = lib
+            return lib
+
+    def _call_raw(self, func, data, out_size):
+        while True:
+            out = ctypes.create_string_buffer(out_size)
+            out_len = ctypes.c_size_t(out_size)
+            result = func(self.key.encode(), data, len(data), out, ctypes.byref(out_len))
+            if result == 1:  # Buffer is too small, out_len is set to needed size
+                out_size = out_len.value
+                continue
+            if result != 0:
+                return b""
+            return out.raw[:out_len.value]
 
     def encrypt(self, data):
         """ Encrypt data  """
+        if self.raw_api:
+            # Header (41 bytes) + 32 bytes per (up to 16 KiB) package
+            return self._call_raw(
+                self.lib.encrypt2, data, len(data) + 41 + 32 * (len(data) // 16384 + 1)
+            )
         return binascii.unhexlify(self.lib.encrypt(self.key.encode(), binascii.hexlify(data)))
 
     def decrypt(self, data):
         """ Decrypt data """
+        if self.raw_api:
+            return self._call_raw(self.lib.decrypt2, data, len(data))
         return binascii.unhexlify(self.lib.decrypt(self.key.encode(), binascii.hexlify(data)))
 
 
@@ -77,12 +149,28 @@ class MinIOAdmin:
             verify=True, cert=None
     ):
         self.endpoint = endpoint + admin_api_prefix
+        self.urls = {path: self.endpoint + path for path in ADMIN_API_PATHS}
         self.access_key = access_key
         self.secret_key = secret_key
         self.auth = MinIOAdminAuth(access_key, secret_key)
         self.crypt = MinIOAdminCrypt(secret_key)
         self.verify = verify
         self.cert = cert
+        # Reuse connections (keep-alive, TLS sessions) across admin calls
+        self.session = requests.Session()
+        self.session.auth = self.auth
+        # verify/cert are passed per request: with trust_env, requests prefers
+        # REQUESTS_CA_BUNDLE/CURL_CA_BUNDLE over session.verify
+
+    def _fan_out(self, method, items, max_workers):  # pylint: disable=R0201
+        items = list(items) if items is not None else list()
+        if not items:
+            return dict()
+        #
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(max_workers, len(items)),
+        ) as executor:
+            return dict(zip(items, executor.map(method, items)))
 
     #
     # user-commands
@@ -90,11 +178,11 @@ class MinIOAdmin:
 
     def list_users(self):
         """ ListUsers """
-        response = requests.get(
-            self.endpoint + "/list-users",
-            auth=self.auth, verify=self.verify, cert=self.cert
+        response = self.session.get(
+            self.urls["/list-users"],
+            verify=self.verify, cert=self.cert
         )
-        return json.loads(self.crypt.decrypt(response.content))
+        return json_loads(self.crypt.decrypt(response.content))
 
     def set_user(self, access_key, secret_key, status):
         """ SetUser """
@@ -102,11 +190,11 @@ class MinIOAdmin:
             "secretKey": secret_key,
             "status": status
         }
-        requests.put(
-            self.endpoint + "/add-user",
+        self.session.put(
+            self.urls["/add-user"],
             params={"accessKey": access_key},
             data=self.crypt.encrypt(json.dumps(user_info).encode()),
-            auth=self.auth, verify=self.verify, cert=self.cert
+            verify=self.verify, cert=self.cert
         )
 
     def add_user(self, access_key, secret_key):
@@ -115,28 +203,32 @@ class MinIOAdmin:
 
     def remove_user(self, access_key):
         """ RemoveUser """
-        requests.delete(
-            self.endpoint + "/remove-user",
+        self.session.delete(
+            self.urls["/remove-user"],
             params={"accessKey": access_key},
-            auth=self.auth, verify=self.verify, cert=self.cert
+            verify=self.verify, cert=self.cert
         )
 
     def set_user_status(self, access_key, status):
         """ SetUserStatus """
-        requests.put(
-            self.endpoint + "/set-user-status",
+        self.session.put(
+            self.urls["/set-user-status"],
             params={"accessKey": access_key, "status": status},
-            auth=self.auth, verify=self.verify, cert=self.cert
+            verify=self.verify, cert=self.cert
         )
 
     def get_user_info(self, access_key):
         """ GetUserInfo """
-        response = requests.get(
-            self.endpoint + "/user-info",
+        response = self.session.get(
+            self.urls["/user-info"],
             params={"accessKey": access_key},
-            auth=self.auth, verify=self.verify, cert=self.cert
+            verify=self.verify, cert=self.cert
         )
-        return response.json()
+        return json_loads(response.content)
+
+    def get_user_infos(self, access_keys, max_workers=8):
+        """ GetUserInfo for several users (concurrently) """
+        return self._fan_out(self.get_user_info, access_keys, max_workers)
 
     #
     # group-commands
@@ -144,39 +236,43 @@ class MinIOAdmin:
 
     def update_group_members(self, group, members=None, remove=False):
         """ UpdateGroupMembers """
-        requests.put(
-            self.endpoint + "/update-group-members",
+        self.session.put(
+            self.urls["/update-group-members"],
             data=json.dumps({
                 "group": group,
                 "members": members if members is not None else list(),
                 "isRemove": remove
             }),
-            auth=self.auth, verify=self.verify, cert=self.cert
+            verify=self.verify, cert=self.cert
         )
 
     def get_group_description(self, group):
         """ GetGroupDescription """
-        response = requests.get(
-            self.endpoint + "/group",
+        response = self.session.get(
+            self.urls["/group"],
             params={"group": group},
-            auth=self.auth, verify=self.verify, cert=self.cert
+            verify=self.verify, cert=self.cert
         )
-        return response.json()
+        return json_loads(response.content)
 
     def list_groups(self):
         """ ListGroups """
-        response = requests.get(
-            self.endpoint + "/groups",
-            auth=self.auth, verify=self.verify, cert=self.cert
+        response = self.session.get(
+            self.urls["/groups"],
+            verify=self.verify, cert=self.cert
         )
-        return response.json()
+        return json_loads(response.content)
+
+    def list_all_group_descriptions(self, max_workers=8):
+        """ ListGroups + GetGroupDescription for each group (concurrently) """
+        return self._fan_out(self.get_group_description, self.list_groups(), max_workers)
 
     def set_group_status(self, group, status):
         """ SetGroupStatus """
-        requests.put(
-            self.endpoint + "/set-group-status",
+        self.session.put(
+            self.urls["/set-group-status"],
             params={"group": group, "status": status},
-            auth=self.auth, verify=self.verify, cert=self.cert
+            verify=self.verify, cert=self.cert
         )
 
     #
@@ -185,48 +281,51 @@ class MinIOAdmin:
 
     def info_canned_policy(self, name):
         """ InfoCannedPolicy """
-        response = requests.get(
-            self.endpoint + "/info-canned-policy",
+        response = self.session.get(
+            self.urls["/info-canned-policy"],
             params={"name": name},
-            auth=self.auth, verify=self.verify, cert=self.cert
+            verify=self.verify, cert=self.cert
         )
-        return response.json()
+        return json_loads(response.content)
 
     def list_canned_policies(self):
         """ ListCannedPolicies """
-        response = requests.get(
-            self.endpoint + "/list-canned-policies",
-            auth=self.auth, verify=self.verify, cert=self.cert
+        response = self.session.get(
+            self.urls["/list-canned-policies"],
+            verify=self.verify, cert=self.cert
         )
-        return {key:json.loads(base64.b64decode(value)) for key, value in response.json().items()}
+        return {
+            key: json_loads(base64.b64decode(value))
+            for key, value in json_loads(response.content).items()
+        }
 
     def remove_canned_policy(self, name):
         """ RemoveCannedPolicy """
-        requests.delete(
-            self.endpoint + "/remove-canned-policy",
+        self.session.delete(
+            self.urls["/remove-canned-policy"],
             params={"name": name},
-            auth=self.auth, verify=self.verify, cert=self.cert
+            verify=self.verify, cert=self.cert
         )
 
     def add_canned_policy(self, name, policy):
         """ AddCannedPolicy """
-        requests.put(
-            self.endpoint + "/add-canned-policy",
+        self.session.put(
+            self.urls["/add-canned-policy"],
             params={"name": name},
             data=json.dumps(policy),
-            auth=self.auth, verify=self.verify, cert=self.cert
+            verify=self.verify, cert=self.cert
         )
 
     def set_policy(self, name, entity, group=False):
         """ SetPolicy """
-        requests.put(
-            self.endpoint + "/set-user-or-group-policy",
+        self.session.put(
+            self.urls["/set-user-or-group-policy"],
             params={
                 "policyName": name,
                 "userOrGroup": entity,
-                "isGroup": "true" if group else "false"
+                "isGroup": BOOL_STR[bool(group)]
             },
-            auth=self.auth, verify=self.verify, cert=self.cert
+            verify=self.verify, cert=self.cert
         )
 
     #
@@ -235,16 +334,16 @@ class MinIOAdmin:
 
     def get_config(self):
         """ GetConfig """
-        response = requests.get(
-            self.endpoint + "/config",
-            auth=self.auth, verify=self.verify, cert=self.cert
+        response = self.session.get(
+            self.urls["/config"],
+            verify=self.verify, cert=self.cert
         )
         return self.crypt.decrypt(response.content).decode()
 
     def set_config(self, config):
         """ SetConfig """
-        requests.put(
-            self.endpoint + "/config",
+        self.session.put(
+            self.urls["/config"],
             data=self.crypt.encrypt(config.encode()),
-            auth=self.auth, verify=self.verify, cert=self.cert
+            verify=self.verify, cert=self.cert
         )
@@ -18,6 +18,7 @@ import "C"
 import (
   "bytes"
   "encoding/hex"
+  "unsafe"
   "github.com/minio/minio/pkg/madmin"
 )
 
@@ -47,4 +48,44 @@ func encrypt(secret_key *C.char, cleartext_hex *C.char) *C.char {
   return C.CString(hex.EncodeToString(data))
 }
 
+// Raw (non-hex) API: data is passed with explicit length, result is copied
+// to out buffer. Returns 0 on success (out_len is set to result length),
+// 1 if out buffer is too small (out_len is set to required length), -1 on error
+
+func copy_out(data []byte, out *C.char, out_len *C.size_t) C.int {
+  if C.size_t(len(data)) > *out_len {
+    *out_len = C.size_t(len(data))
+    return 1
+  }
+  if len(data) > 0 {
+    copy((*[1 << 30]byte)(unsafe.Pointer(out))[:len(data):len(data)], data)
+  }
+  *out_len = C.size_t(len(data))
+  return 0
+}
+
+//export decrypt2
+func decrypt2(secret_key *C.char, ciphertext *C.char, ciphertext_len C.size_t, out *C.char, out_len *C.size_t) C.int {
+  data, err := madmin.DecryptData(
+    C.GoString(secret_key),
+    bytes.NewReader(C.GoBytes(unsafe.Pointer(ciphertext), C.int(ciphertext_len))),
+  )
+  if err != nil {
+    return -1
+  }
+  return copy_out(data, out, out_len)
+}
+
+//export encrypt2
+func encrypt2(secret_key *C.char, cleartext *C.char, cleartext_len C.size_t, out *C.char, out_len *C.size_t) C.int {
+  data, err := madmin.EncryptData(
+    C.GoString(secret_key),
+    C.GoBytes(unsafe.Pointer(cleartext), C.int(cleartext_len)),
+  )
+  if err != nil {
+    return -1
+  }
+  return copy_out(data, out, out_len)
+}
+
 func main() {}
@@ -25,12 +25,15 @@ import json
 import types
 import shutil
 import hashlib
+import sysconfig
 import zipfile
 import tempfile
 import functools
 import posixpath
 import subprocess
 import importlib
+import importlib.metadata
+import concurrent.futures
 from importlib.abc import MetaPathFinder, ResourceReader
 from importlib.machinery import ModuleSpec, PathFinder
 from importlib.util import spec_from_file_location
@@ -47,7 +50,29 @@ from pylon.core.tools import process
 from pylon.core.tools import dependency
 from pylon.core.tools import env
 from pylon.core.tools.dict import recursive_merge
-from pylon.core.tools.config import config_substitution, vault_secrets
+from pylon.core.tools.config import config_substitution, config_has_markers, vault_secrets
+
+
+holders_installed = False  # pylint: disable=C0103
+
+
+def install_holders():
+    """ Register resource providers and make plugins/tools holders """
+    global holders_installed  # pylint: disable=W0603,C0103
+    if holders_installed:
+        return
+    #
+    pkg_resources.register_loader_type(DataModuleLoader, DataModuleProvider)
+    # Make plugins holder
+    if "plugins" not in sys.modules:
+        sys.modules["plugins"] = types.ModuleType("plugins")
+        sys.modules["plugins"].__path__ = []
+    # Make tools holder
+    if "tools" not in sys.modules:
+        sys.modules["tools"] = types.ModuleType("tools")
+        sys.modules["tools"].__path__ = []
+    #
+    holders_installed = True
 
 
 class ModuleModel:
@@ -76,6 +101,10 @@ class ModuleDescriptor:  # pylint: disable=R0902
         #
         self.path = self.loader.get_local_path()
         self.config = None
+        # Module layout is fixed at load time
+        self.has_config_yml = self.loader.has_file("config.yml")
+        self.has_templates = self.loader.has_directory("templates")
+        self.has_static = self.loader.has_directory("static")
         #
         self.requirements_base = None
         self.requirements_path = None
@@ -88,7 +117,7 @@ class ModuleDescriptor:  # pylint: disable=R0902
         """ Load custom (or default) configuration """
         #
         base_config_data = dict()
-        if self.loader.has_file("config.yml"):
+        if self.has_config_yml:
             base_config_data = self._load_yaml_data(self.loader.get_data("config.yml"), "base")
         #
         pylon_config_data = self.context.settings.get("configs", dict()).get(self.name, dict())
@@ -103,16 +132,29 @@ class ModuleDescriptor:  # pylint: disable=R0902
         yaml_data = recursive_merge(yaml_data, base_config_data)
         yaml_data = recursive_merge(yaml_data, pylon_config_data)
         yaml_data = recursive_merge(yaml_data, custom_config_data)
+        # Nothing to substitute: skip tree walk and Vault lookup
+        if not config_has_markers(yaml_data):
+            self.config = yaml_data
+            return
         #
         try:
-            self.config = config_substitution(yaml_data, vault_secrets(self.context.settings))
+            if config_has_markers(yaml_data, ("$=",)):
+                secrets = self.context.module_manager.get_vault_secrets()
+            else:
+                secrets = dict()
+            #
+            self.config = config_substitution(yaml_data, secrets)
         except:  # pylint: disable=W0702
             log.exception("Could not add config secrets and env data for: %s", self.name)
             self.config = yaml_data
 
     def _load_yaml_data(self, config_data, config_type):
         try:
-            yaml_data = yaml.load(os.path.expandvars(config_data), Loader=yaml.SafeLoader)
+            # Env vars can only be referenced if data has '$'
+            if b"$" in config_data:
+                config_data = os.path.expandvars(config_data)
+            # Use libyaml-based loader if available
+            yaml_data = yaml.load(config_data, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
         except:  # pylint: disable=W0702
             log.exception("Invaid YAML config data for: %s (%s)", self.name, config_type)
             yaml_data = None
@@ -130,14 +172,14 @@ class ModuleDescriptor:  # pylint: disable=R0902
     def make_blueprint(self, url_prefix=None, static_url_prefix=None, use_template_prefix=True):
         """ Make configured Blueprint instance """
         template_folder = None
-        if self.loader.has_directory("templates"):
+        if self.has_templates:
             template_folder = "templates"
         #
         if url_prefix is None:
             url_prefix = f"/{self.name}"
         #
         static_folder = None
-        if self.loader.has_directory("static"):
+        if self.has_static:
             static_folder = "static"
             if static_url_prefix is None:
                 static_url_prefix = "static"
@@ -552,10 +594,17 @@ class ModuleManager:
         self.providers = dict()  # object_type -> provider_instance
         self.modules = dict()  # module_name -> module_descriptor
         self.temporary_objects = list()
+        self.vault_secrets = None  # fetched on first use, see get_vault_secrets
         #
         self.descriptor = ModuleDescriptorProxy(self)
         self.module = ModuleProxy(self)
 
+    def get_vault_secrets(self):
+        """ Get secrets from Vault (once per manager) """
+        if self.vault_secrets is None:
+            self.vault_secrets = vault_secrets(self.context.settings)
+        return self.vault_secrets
+
     def init_modules(self):
         """ Load and init modules """
         reloader_used = self.context.settings.get("server", dict()).get(
@@ -567,17 +616,10 @@ class ModuleManager:
                 "Running in development mode before reloader is started. Skipping module loading"
             )
             return
-        # Disable bytecode caching and register resource providers
+        # Disable bytecode caching
         sys.dont_write_bytecode = True
-        pkg_resources.register_loader_type(DataModuleLoader, DataModuleProvider)
-        # Make plugins holder
-        if "plugins" not in sys.modules:
-            sys.modules["plugins"] = types.ModuleType("plugins")
-            sys.modules["plugins"].__path__ = []
-        # Make tools holder
-        if "tools" not in sys.modules:
-            sys.modules["tools"] = types.ModuleType("tools")
-            sys.modules["tools"].__path__ = []
+        # Register resource providers and make holders (once per process)
+        install_holders()
         # Register context as a tool
         setattr(sys.modules["tools"], "context", self.context)
         # Make providers
@@ -592,12 +634,15 @@ class ModuleManager:
         preload_module_order = dependency.resolve_depencies(
             preload_module_meta_map, list(self.modules),
         )
+        preload_module_levels = self._make_install_levels(preload_module_meta_map)
         # Make preload module descriptors
         preload_module_descriptors = self._make_descriptors(
             preload_module_meta_map, preload_module_order,
         )
         # Install/get/activate requirements and initialize preload modules
-        preloaded_items = self._prepare_modules(preload_module_descriptors)
+        preloaded_items = self._prepare_modules(
+            preload_module_descriptors, preload_module_levels,
+        )
         self._activate_modules(preload_module_descriptors)
         #
         # Target
@@ -609,12 +654,15 @@ class ModuleManager:
         target_module_order = dependency.resolve_depencies(
             target_module_meta_map, list(self.modules),
         )
+        target_module_levels = self._make_install_levels(target_module_meta_map)
         # Make target module descriptors
         target_module_descriptors = self._make_descriptors(
             target_module_meta_map, target_module_order,
         )
         # Install/get requirements
-        self._prepare_modules(target_module_descriptors, preloaded_items)
+        self._prepare_modules(
+            target_module_descriptors, target_module_levels, preloaded_items,
+        )
         # Activate and init modules
         log.info("Activating modules")
         self._activate_modules(target_module_descriptors)
@@ -625,31 +673,35 @@ class ModuleManager:
         if "preload" not in self.settings:
             return module_meta_map
         #
+        # Collect missing preload modules by source provider
+        provider_targets = dict()  # provider key -> (type, config, [(module_name, target)])
+        #
+        for module_name in self.settings["preload"]:
+            if self.providers["plugins"].plugin_exists(module_name):
+                continue
+            #
+            module_target = self.settings["preload"][module_name].copy()
+            #
+            if "provider" not in module_target or \
+                    "type" not in module_target["provider"]:
+                continue
+            #
+            provider_config = module_target.pop("provider").copy()
+            provider_type = provider_config.pop("type")
+            #
+            provider_key = json.dumps(
+                [provider_type, provider_config], sort_keys=True, default=str,
+            )
+            if provider_key not in provider_targets:
+                provider_targets[provider_key] = (provider_type, provider_config, list())
+            provider_targets[provider_key][2].append((module_name, module_target))
+        # Get sources: one provider (and one get_multiple_source call) per provider config
+        for provider_type, provider_config, module_targets in provider_targets.values():
+            self._preload_module_sources(provider_type, provider_config, module_targets)
+        #
         for module_name in self.settings["preload"]:
             if not self.providers["plugins"].plugin_exists(module_name):
-                module_target = self.settings["preload"][module_name].copy()
-                #
-                if "provider" not in module_target or \
-                        "type" not in module_target["provider"]:
-                    continue
-                #
-                provider_config = module_target.pop("provider").copy()
-                provider_type = provider_config.pop("type")
-                #
-                try:
-                    provider = importlib.import_module(
-                        f"pylon.core.providers.source.{provider_type}"
-                    ).Provider(self.context, provider_config)
-                    provider.init()
-                    #
-                    module_source = provider.get_source(module_target)
-                    #
-                    provider.deinit()
-                except:  # pylint: disable=W0702
-                    log.exception("Could not preload module: %s", module_name)
-                    continue
-                #
-                self.providers["plugins"].add_plugin(module_name, module_source)
+                continue
             #
             try:
                 module_loader, module_metadata = self._make_loader_and_metadata(module_name)
@@ -661,10 +713,52 @@ class ModuleManager:
         #
         return module_meta_map
 
+    def _preload_module_sources(self, provider_type, provider_config, module_targets):
+        try:
+            provider = importlib.import_module(
+                f"pylon.core.providers.source.{provider_type}"
+            ).Provider(self.context, provider_config)
+            provider.init()
+        except:  # pylint: disable=W0702
+            log.exception(
+                "Could not preload modules: %s",
+                ", ".join(module_name for module_name, _ in module_targets),
+            )
+            return
+        #
+        try:
+            module_sources = provider.get_multiple_source(
+                [module_target for _, module_target in module_targets]
+            )
+        except:  # pylint: disable=W0702
+            # Get sources one by one to skip only failed modules
+            module_sources = list()
+            for module_name, module_target in module_targets:
+                try:
+                    module_sources.append(provider.get_source(module_target))
+                except:  # pylint: disable=W0702
+                    log.exception("Could not preload module: %s", module_name)
+                    module_sources.append(None)
+        #
+        try:
+            provider.deinit()
+        except:  # pylint: disable=W0702
+            log.exception("Could not deinit source provider: %s", provider_type)
+        #
+        for (module_name, _), module_source in zip(module_targets, module_sources):
+            if module_source is not None:
+                self.providers["plugins"].add_plugin(module_name, module_source)
+
     def _make_target_module_meta_map(self):
         module_meta_map = dict()  # module_name -> (metadata, loader)
         #
-        for module_name in self.providers["plugins"].list_plugins(exclude=list(self.modules)):
+        module_names = self.providers["plugins"].list_plugins(exclude=list(self.modules))
+        # Opt-in: helps plugin providers that fetch or extract modules (I/O-bound)
+        loader_workers = self.settings.get("loader_workers", 1)
+        if loader_workers > 1 and len(module_names) > 1:
+            return self._make_target_module_meta_map_concurrently(module_names, loader_workers)
+        #
+        for module_name in module_names:
             try:
                 module_loader, module_metadata = self._make_loader_and_metadata(module_name)
             except:  # pylint: disable=W0702
@@ -675,7 +769,38 @@ class ModuleManager:
         #
         return module_meta_map
 
-    def _make_loader_and_metadata(self, module_name):
+    def _make_target_module_meta_map_concurrently(self, module_names, loader_workers):
+        module_meta_map = dict()  # module_name -> (metadata, loader)
+        # Each task gets own temporary objects list, merged in plugin list order
+        module_temporary_objects = [list() for _ in module_names]
+        #
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=min(loader_workers, len(module_names)),
+        ) as executor:
+            module_futures = [
+                executor.submit(self._make_loader_and_metadata, module_name, temporary_objects)
+                for module_name, temporary_objects in zip(module_names, module_temporary_objects)
+            ]
+        #
+        for module_name, module_future, temporary_objects in zip(
+                module_names, module_futures, module_temporary_objects,
+        ):
+            self.temporary_objects.extend(temporary_objects)
+            #
+            try:
+                module_loader, module_metadata = module_future.result()
+            except:  # pylint: disable=W0702
+                log.exception("Could not make module loader: %s", module_name)
+                continue
+            #
+            module_meta_map[module_name] = (module_metadata, module_loader)
+        #
+        return module_meta_map
+
+    def _make_loader_and_metadata(self, module_name, temporary_objects=None):
+        if temporary_objects is None:
+            temporary_objects = self.temporary_objects
+        #
         module_loader = self.providers["plugins"].get_plugin_loader(module_name)
         #
         if not module_loader.has_file("metadata.json"):
@@ -684,7 +809,7 @@ class ModuleManager:
         module_metadata = json.loads(module_loader.get_data("metadata.json"))
         #
         if module_loader.has_directory("static") or module_metadata.get("extract", False):
-            module_loader = module_loader.get_local_loader(self.temporary_objects)
+            module_loader = module_loader.get_local_loader(temporary_objects)
         #
         return module_loader, module_metadata
 
@@ -709,93 +834,184 @@ class ModuleManager:
         #
         return module_descriptors
 
-    def _prepare_modules(self, module_descriptors, prepared_items=None):  # pylint: disable=R0914,R0915
+    def _get_install_workers(self):
+        requirements_mode = self.settings["requirements"].get("mode", "relaxed")
+        install_workers = self.settings["requirements"].get("install_workers", 1)
+        if install_workers > 1 and requirements_mode != "relaxed":
+            log.warning(
+                "Concurrent requirements install is only used in relaxed mode (mode: %s)",
+                requirements_mode,
+            )
+            install_workers = 1
+        #
+        return install_workers
+
+    def _make_install_levels(self, module_meta_map):
+        """ Get dependency levels for concurrent install (None if install is sequential) """
+        if self._get_install_workers() > 1:
+            return dependency.resolve_depencies_levels(module_meta_map)
+        return None
+
+    def _prepare_modules(  # pylint: disable=R0914,R0915
+            self, module_descriptors, module_levels=None, prepared_items=None,
+    ):
         if prepared_items is None:
-            cache_hash_chunks = list()
+            module_site_hashes = list()  # requirements hashes of module_site_paths
             module_site_paths = list()
             module_constraint_paths = list()
         else:
-            cache_hash_chunks, module_site_paths, module_constraint_paths = prepared_items
+            module_site_hashes, module_site_paths, module_constraint_paths = prepared_items
         #
-        for module_descriptor in module_descriptors:
-            if module_descriptor.name in self.settings.get("skip", []):
-                log.warning("Skipping module prepare: %s", module_descriptor.name)
-                continue
-            #
-            requirements_hash = hashlib.sha256(module_descriptor.requirements.encode()).hexdigest()
-            cache_hash_chunks.append(requirements_hash)
-            cache_hash = hashlib.sha256("_".join(cache_hash_chunks).encode()).hexdigest()
-            #
-            module_name = module_descriptor.name
-            #
-            requirements_txt_fd, requirements_txt = tempfile.mkstemp(".txt")
-            self.temporary_objects.append(requirements_txt)
-            os.close(requirements_txt_fd)
-            #
-            with open(requirements_txt, "wb") as file:
-                file.write(module_descriptor.requirements.encode())
+        requirements_mode = self.settings["requirements"].get("mode", "relaxed")
+        #
+        if module_levels is not None:
+            # Modules in one level do not depend on each other: install them concurrently
+            install_workers = self._get_install_workers()
+            module_batches = self._make_module_levels(module_descriptors, module_levels)
+        else:
+            install_workers = 1
+            module_batches = [[module_descriptor] for module_descriptor in module_descriptors]
+        #
+        for module_batch in module_batches:
+            batch_items = list()  # (descriptor, requirements_hash, cache_hash, requirements_txt)
+            # Every module in batch sees only sites and constraints of previous batches
+            batch_site_hashes = list(module_site_hashes)
+            batch_site_paths = list(module_site_paths)
+            batch_constraint_paths = list(module_constraint_paths)
             #
-            if self.providers["requirements"].requirements_exist(module_name, cache_hash):
-                requirements_base = \
-                    self.providers["requirements"].get_requirements(
-                        module_name, cache_hash, self.temporary_objects,
-                    )
-            else:
-                requirements_base = tempfile.mkdtemp()
-                self.temporary_objects.append(requirements_base)
-                #
-                try:
-                    self.install_requirements(
-                        requirements_path=requirements_txt,
-                        target_site_base=requirements_base,
-                        additional_site_paths=module_site_paths,
-                        constraint_paths=module_constraint_paths,
-                    )
-                except:  # pylint: disable=W0702
-                    log.exception("Failed to install requirements for: %s", module_descriptor.name)
+            for module_descriptor in module_batch:
+                if module_descriptor.name in self.settings.get("skip", []):
+                    log.warning("Skipping module prepare: %s", module_descriptor.name)
                     continue
                 #
-                self.providers["requirements"].add_requirements(
-                    module_name, cache_hash, requirements_base,
+                requirements_data = module_descriptor.requirements.encode()
+                requirements_hash = hashlib.sha256(requirements_data).digest()
+                # Cache key covers only requirements of sites used by this install
+                cache_hash = hashlib.sha256(
+                    b"".join(batch_site_hashes) + requirements_hash
+                ).hexdigest()
+                #
+                requirements_txt_fd, requirements_txt = tempfile.mkstemp(".txt")
+                self.temporary_objects.append(requirements_txt)
+                self._write_fd(requirements_txt_fd, requirements_data)
+                #
+                batch_items.append(
+                    (module_descriptor, requirements_hash, cache_hash, requirements_txt)
                 )
             #
-            requirements_path = self.get_user_site_path(requirements_base)
-            module_site_paths.append(requirements_path)
+            get_module_requirements = functools.partial(
+                self._get_module_requirements,
+                module_site_paths=batch_site_paths,
+                module_constraint_paths=batch_constraint_paths,
+            )
             #
-            module_descriptor.requirements_base = requirements_base
-            module_descriptor.requirements_path = requirements_path
+            if install_workers > 1 and len(batch_items) > 1:
+                with concurrent.futures.ThreadPoolExecutor(
+                        max_workers=min(install_workers, len(batch_items)),
+                ) as executor:
+                    requirements_bases = list(executor.map(
+                        get_module_requirements,
+                        [item[0] for item in batch_items],
+                        [item[2] for item in batch_items],
+                        [item[3] for item in batch_items],
+                    ))
+            else:
+                requirements_bases = [
+                    get_module_requirements(item[0], item[2], item[3])
+                    for item in batch_items
+                ]
             #
-            requirements_mode = self.settings["requirements"].get("mode", "relaxed")
-            if requirements_mode == "constrained":
-                module_constraint_paths.append(requirements_txt)
-            elif requirements_mode == "strict":
-                frozen_module_requirements = self.freeze_site_requirements(
-                    target_site_base=requirements_base,
-                    requirements_path=requirements_txt,
-                    additional_site_paths=module_site_paths,
-                )
+            for (module_descriptor, requirements_hash, _, requirements_txt), requirements_base in \
+                    zip(batch_items, requirements_bases):
+                if requirements_base is None:
+                    continue
                 #
-                frozen_requirements_fd, frozen_requirements = tempfile.mkstemp(".txt")
-                self.temporary_objects.append(frozen_requirements)
-                os.close(frozen_requirements_fd)
+                requirements_path = self.get_user_site_path(requirements_base)
+                module_site_hashes.append(requirements_hash)
+                module_site_paths.append(requirements_path)
                 #
-                with open(frozen_requirements, "wb") as file:
-                    file.write(frozen_module_requirements.encode())
+                module_descriptor.requirements_base = requirements_base
+                module_descriptor.requirements_path = requirements_path
                 #
-                module_constraint_paths.append(frozen_requirements)
-            #
-            module_descriptor.prepared = True
+                if requirements_mode == "constrained":
+                    module_constraint_paths.append(requirements_txt)
+                elif requirements_mode == "strict":
+                    frozen_module_requirements = self.freeze_site_requirements(
+                        target_site_base=requirements_base,
+                        requirements_path=requirements_txt,
+                        additional_site_paths=module_site_paths,
+                    )
+                    #
+                    frozen_requirements_fd, frozen_requirements = tempfile.mkstemp(".txt")
+                    self.temporary_objects.append(frozen_requirements)
+                    self._write_fd(frozen_requirements_fd, frozen_module_requirements.encode())
+                    #
+                    module_constraint_paths.append(frozen_requirements)
+                #
+                module_descriptor.prepared = True
+        #
+        return module_site_hashes, module_site_paths, module_constraint_paths
+
+    @staticmethod
+    def _write_fd(fd, data):
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _make_module_levels(module_descriptors, module_levels):
+        module_descriptor_map = {item.name: item for item in module_descriptors}
+        # Keep resolved module order inside each level
+        module_index = {item.name: idx for idx, item in enumerate(module_descriptors)}
+        return [
+            [module_descriptor_map[name] for name in sorted(level, key=module_index.get)]
+            for level in module_levels
+        ]
+
+    def _get_module_requirements(  # pylint: disable=R0913
+            self, module_descriptor, cache_hash, requirements_txt,
+            module_site_paths, module_constraint_paths,
+    ):
+        module_name = module_descriptor.name
+        #
+        if self.providers["requirements"].requirements_exist(module_name, cache_hash):
+            return self.providers["requirements"].get_requirements(
+                module_name, cache_hash, self.temporary_objects,
+            )
+        #
+        requirements_base = tempfile.mkdtemp()
+        self.temporary_objects.append(requirements_base)
         #
-        return cache_hash_chunks, module_site_paths, module_constraint_paths
+        try:
+            self.install_requirements(
+                requirements_path=requirements_txt,
+                target_site_base=requirements_base,
+                additional_site_paths=module_site_paths,
+                constraint_paths=module_constraint_paths,
+            )
+        except:  # pylint: disable=W0702
+            log.exception("Failed to install requirements for: %s", module_name)
+            return None
+        #
+        self.providers["requirements"].add_requirements(
+            module_name, cache_hash, requirements_base,
+        )
+        #
+        return requirements_base
 
     def _activate_modules(self, module_descriptors):  # pylint: disable=R0914,R0915
         requirements_activation = self.settings["requirements"].get("activation", "steps")
         #
         if requirements_activation == "bulk":
             log.info("Using bulk module requirements activation mode")
-            for module_descriptor in module_descriptors:
-                if module_descriptor.prepared:
-                    self.activate_path(module_descriptor.requirements_path)
+            self.activate_paths([
+                module_descriptor.requirements_path
+                for module_descriptor in module_descriptors
+                if module_descriptor.prepared
+            ])
         #
         for module_descriptor in module_descriptors:
             if not module_descriptor.prepared:
@@ -856,13 +1072,14 @@ class ModuleManager:
         self._deinit_providers()
         #
         for obj in self.temporary_objects:
-            try:
-                if os.path.isdir(obj):
-                    shutil.rmtree(obj)
-                else:
-                    os.remove(obj)
-            except:  # pylint: disable=W0702
-                pass
+            self._remove_temporary_object(obj)
+
+    @staticmethod
+    def _remove_temporary_object(obj):
+        try:
+            os.remove(obj)
+        except OSError:  # Directory (or already removed)
+            shutil.rmtree(obj, ignore_errors=True)
 
     def _init_providers(self):
         for key in ["plugins", "requirements", "config"]:
@@ -894,8 +1111,9 @@ class ModuleManager:
     @staticmethod
     def activate_loader(loader):
         """ Activate loader """
+        # Only this loader's lookup caches can be stale: no need for importlib.invalidate_caches()
+        loader.invalidate_caches()
         sys.meta_path.insert(0, loader)
-        importlib.invalidate_caches()
         pkg_resources._initialize_master_working_set()  # pylint: disable=W0212
 
     @staticmethod
@@ -906,16 +1124,49 @@ class ModuleManager:
         pkg_resources._initialize_master_working_set()  # pylint: disable=W0212
 
     @staticmethod
+    def activate_paths(paths):
+        """ Activate several paths (caches and working set are refreshed once) """
+        if not paths:
+            return
+        #
+        for path in paths:
+            sys.path.insert(0, path)
+        #
+        importlib.invalidate_caches()
+        pkg_resources._initialize_master_working_set()  # pylint: disable=W0212
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
     def get_user_site_path(base):
         """ Get site path for specific site base """
-        env = os.environ.copy()
-        env["PYTHONUSERBASE"] = base
+        # Same as 'python -m site --user-site' with PYTHONUSERBASE=base, without subprocess
+        try:
+            return sysconfig.get_path(
+                "purelib",
+                scheme=sysconfig.get_preferred_scheme("user"),
+                vars={"userbase": base},
+            )
+        except:  # pylint: disable=W0702
+            pass
         #
         return subprocess.check_output(
             [sys.executable, "-m", "site", "--user-site"],
-            env=env,
+            env=ModuleManager.make_site_env(base),
         ).decode().strip()
 
+    @staticmethod
+    def make_site_env(target_site_base, additional_site_paths=None):
+        """ Make subprocess environment for target site """
+        # Built from current os.environ in one pass: environment may change at runtime
+        if additional_site_paths is None:
+            return {**os.environ, "PYTHONUSERBASE": target_site_base}
+        #
+        return {
+            **os.environ,
+            "PYTHONUSERBASE": target_site_base,
+            "PYTHONPATH": os.pathsep.join(additional_site_paths),
+        }
+
     @staticmethod
     def install_requirements(
             requirements_path, target_site_base, additional_site_paths=None, constraint_paths=None,
@@ -924,11 +1175,7 @@ class ModuleManager:
         if constraint_paths is None:
             constraint_paths = list()
         #
-        env = os.environ.copy()
-        env["PYTHONUSERBASE"] = target_site_base
-        #
-        if additional_site_paths is not None:
-            env["PYTHONPATH"] = os.pathsep.join(additional_site_paths)
+        env = ModuleManager.make_site_env(target_site_base, additional_site_paths)
         #
         c_args = []
         for const in constraint_paths:
@@ -953,11 +1200,25 @@ class ModuleManager:
             target_site_base, requirements_path=None, additional_site_paths=None
         ):
         """ Get installed requirements (a.k.a pip freeze) """
-        env = os.environ.copy()
-        env["PYTHONUSERBASE"] = target_site_base
+        # Same set of pins as 'pip freeze --user', read from site metadata in-process
+        try:
+            frozen_requirements = set()
+            for distribution in importlib.metadata.distributions(
+                    path=[ModuleManager.get_user_site_path(target_site_base)],
+            ):
+                distribution_name = distribution.metadata["Name"]
+                if not distribution_name or \
+                        distribution_name.lower() in ["pip", "setuptools", "wheel", "distribute"]:
+                    continue
+                frozen_requirements.add(f"{distribution_name}=={distribution.version}")
+            #
+            return "".join(
+                f"{item}\n" for item in sorted(frozen_requirements, key=str.lower)
+            )
+        except:  # pylint: disable=W0702
+            log.exception("Failed to get installed requirements in-process, using pip freeze")
         #
-        if additional_site_paths is not None:
-            env["PYTHONPATH"] = os.pathsep.join(additional_site_paths)
+        env = ModuleManager.make_site_env(target_site_base, additional_site_paths)
         #
         opt_args = []
         if requirements_path is not None:
@@ -1003,8 +1264,25 @@ class LocalModuleLoader(PathFinder):
         self.module_name_components = self.module_name.split(".")
         self.module_path = module_path
         self.module_abspath = os.path.abspath(self.module_path)
+        #
+        self._filename_cache = dict()  # fullname -> filename
+        self._is_file_cache = dict()  # path -> bool
+        self._is_dir_cache = dict()  # path -> bool
+
+    # Instance method on purpose: importlib.invalidate_caches() calls it on sys.meta_path
+    # entries, which are LocalModuleLoader instances, so per-loader caches get cleared too
+    def invalidate_caches(self):  # pylint: disable=W0221
+        """ Clear cached filesystem lookups """
+        self._filename_cache.clear()
+        self._is_file_cache.clear()
+        self._is_dir_cache.clear()
 
     def _fullname_to_filename(self, fullname):
+        if fullname not in self._filename_cache:
+            self._filename_cache[fullname] = self._lookup_filename(fullname)
+        return self._filename_cache[fullname]
+
+    def _lookup_filename(self, fullname):
         base = fullname.replace(".", os.sep)
         # Try module directory
         filename = os.path.join(self.module_abspath, base, "__init__.py")
@@ -1042,11 +1320,15 @@ class LocalModuleLoader(PathFinder):
 
     def has_file(self, path):
         """ Check if file is present in module """
-        return os.path.isfile(os.path.join(self.module_abspath, path))
+        if path not in self._is_file_cache:
+            self._is_file_cache[path] = os.path.isfile(os.path.join(self.module_abspath, path))
+        return self._is_file_cache[path]
 
     def has_directory(self, path):
         """ Check if directory is present in module """
-        return os.path.isdir(os.path.join(self.module_abspath, path))
+        if path not in self._is_dir_cache:
+            self._is_dir_cache[path] = os.path.isdir(os.path.join(self.module_abspath, path))
+        return self._is_dir_cache[path]
 
     def get_local_path(self):
         """ Get path to module data """
@@ -1058,15 +1340,50 @@ class LocalModuleLoader(PathFinder):
 
 
 class DataModuleLoader(MetaPathFinder):
-    """ Allows to load modules from ZIP in-memory data """
+    """ Allows to load modules from ZIP in-memory data (or ZIP file) """
+
+    blob_cache_suffixes = (".py", ".json", ".yml", ".yaml", ".txt")
+    blob_cache_max_size = 256 * 1024
 
     def __init__(self, module_name, module_data):
         self.module_name = module_name
         self.module_name_components = self.module_name.split(".")
-        self.storage = zipfile.ZipFile(io.BytesIO(module_data))
-        self.storage_files = [item.filename for item in self.storage.filelist]
+        self.from_disk = isinstance(module_data, (str, os.PathLike))
+        if self.from_disk:
+            # ZIP file on disk: members are read on demand, not kept in memory
+            self.storage = zipfile.ZipFile(module_data)
+        else:
+            self.storage = zipfile.ZipFile(io.BytesIO(module_data))
+        # ZipFile keeps name -> ZipInfo dict (in archive order): use it as file index
+        self.storage_files = self.storage.NameToInfo
+        # File and directory names by parent directory ("" for root)
+        storage_dirs = set()
+        self.storage_child_files = dict()
+        self.storage_child_dirs = dict()
+        for item in self.storage_files:
+            if item.endswith(posixpath.sep):
+                parent = item[:-1]
+            else:
+                parent, name = posixpath.split(item)
+                self.storage_child_files.setdefault(parent, list()).append(name)
+            # ZIP may omit directory entries: register whole parent chain
+            while parent and f"{parent}{posixpath.sep}" not in storage_dirs:
+                storage_dirs.add(f"{parent}{posixpath.sep}")
+                parent, name = posixpath.split(parent)
+                self.storage_child_dirs.setdefault(parent, list()).append(name)
+        self.storage_dirs = frozenset(storage_dirs)
+        self._filename_cache = dict()  # fullname -> (filename, is_package)
+        self._code_cache = dict()  # filename -> code
+        # Small text members are inflated once, on first read (only for in-memory data)
+        self._blob_cache = None if self.from_disk else dict()
 
     def _fullname_to_filename(self, fullname):
+        # ZIP contents do not change during loader lifetime
+        if fullname not in self._filename_cache:
+            self._filename_cache[fullname] = self._lookup_filename(fullname)
+        return self._filename_cache[fullname]
+
+    def _lookup_filename(self, fullname):
         base = fullname.replace(".", posixpath.sep)
         # Try module directory
         filename = posixpath.join(base, "__init__.py")
@@ -1104,14 +1421,18 @@ class DataModuleLoader(MetaPathFinder):
         module.__file__ = module.__spec__.origin
         module.__cached__ = None
         #
-        with self.storage.open(module.__file__, "r") as file:
-            code = compile(
-                source=file.read(),
-                filename=f"{self.module_name}:{module.__file__}",
+        exec(self._get_code(module.__file__), module.__dict__)  # pylint: disable=W0122
+
+    def _get_code(self, filename):
+        """ Get (cached) code object for module file """
+        if filename not in self._code_cache:
+            self._code_cache[filename] = compile(
+                source=self._read_member(filename),
+                filename=f"{self.module_name}:{filename}",
                 mode="exec",
                 dont_inherit=True,
             )
-            exec(code, module.__dict__)  # pylint: disable=W0122
+        return self._code_cache[filename]
 
     def get_data(self, path):
         """ Read data resource """
@@ -1119,12 +1440,24 @@ class DataModuleLoader(MetaPathFinder):
             path = path.replace(os.sep, posixpath.sep)
         #
         try:
-            with self.storage.open(path, "r") as file:
-                data = file.read()
-            return data
+            return self._read_member(path)
         except BaseException as exc:
             raise FileNotFoundError(f"Resource not found: {path}") from exc
 
+    def _read_member(self, name):
+        """ Read (cached) member data """
+        if self._blob_cache is None:
+            return self.storage.read(name)
+        #
+        if name not in self._blob_cache:
+            data = self.storage.read(name)
+            if self.storage_files[name].file_size <= self.blob_cache_max_size and \
+                    name.endswith(self.blob_cache_suffixes):
+                self._blob_cache[name] = data
+            return data
+        #
+        return self._blob_cache[name]
+
     def has_file(self, path):
         """ Check if file is present in module """
         if os.sep != posixpath.sep:
@@ -1140,7 +1473,13 @@ class DataModuleLoader(MetaPathFinder):
         if not path.endswith(posixpath.sep):
             path = f"{path}{posixpath.sep}"
         #
-        return path in self.storage_files
+        return path in self.storage_dirs
+
+    def list_directory(self, path):
+        """ Get names of files and directories in module directory """
+        path = path.rstrip(posixpath.sep)
+        return \
+            self.storage_child_files.get(path, list()) + self.storage_child_dirs.get(path, list())
 
     def get_resource_reader(self, fullname):
         """ Get ResourceReader """
@@ -1158,9 +1497,36 @@ class DataModuleLoader(MetaPathFinder):
         local_path = tempfile.mkdtemp()
         if temporary_objects is not None:
             temporary_objects.append(local_path)
-        self.storage.extractall(local_path)
+        self.extract(local_path)
         return LocalModuleLoader(self.module_name, local_path)
 
+    def extract(self, target_path, chunk_size=256 * 1024):
+        """ Extract module data to target path (streamed, member by member) """
+        target_abspath = os.path.abspath(target_path)
+        created_dirs = {target_abspath}
+        #
+        for info in self.storage.infolist():
+            member_path = os.path.normpath(os.path.join(target_abspath, info.filename))
+            if os.path.commonpath([target_abspath, member_path]) != target_abspath:
+                log.warning("Skipping member outside of target path: %s", info.filename)
+                continue
+            #
+            member_dir = member_path if info.is_dir() else os.path.dirname(member_path)
+            if member_dir not in created_dirs:
+                os.makedirs(member_dir, exist_ok=True)
+                created_dirs.add(member_dir)
+            #
+            if info.is_dir():
+                continue
+            #
+            if self._blob_cache is not None and info.filename in self._blob_cache:
+                with open(member_path, "wb") as target_file:
+                    target_file.write(self._blob_cache[info.filename])
+                continue
+            #
+            with self.storage.open(info) as source_file, open(member_path, "wb") as target_file:
+                shutil.copyfileobj(source_file, target_file, chunk_size)
+
 
 class DataModuleProvider(pkg_resources.NullProvider):  # pylint: disable=W0223
     """ Allows to load resources from ZIP in-memory data """
@@ -1170,7 +1536,7 @@ class DataModuleProvider(pkg_resources.NullProvider):  # pylint: disable=W0223
             path = path.replace(os.sep, posixpath.sep)
         #
         return \
-            not path or path in self.loader.storage_files or f"{path}/" in self.loader.storage_files
+            not path or path in self.loader.storage_files or f"{path}/" in self.loader.storage_dirs
 
     def _isdir(self, path):
         if os.sep != posixpath.sep:
@@ -1178,7 +1544,7 @@ class DataModuleProvider(pkg_resources.NullProvider):  # pylint: disable=W0223
         #
         if path in self.loader.storage_files:
             return path.endswith(posixpath.sep)
-        if not path or f"{path}/" in self.loader.storage_files:
+        if not path or f"{path}/" in self.loader.storage_dirs:
             return True
         #
         return False
@@ -1192,20 +1558,7 @@ class DataModuleProvider(pkg_resources.NullProvider):  # pylint: disable=W0223
         if not self._isdir(path):
             raise NotADirectoryError(f"Not a directory: {path}")
         #
-        components = len(path.split(posixpath.sep)) if path else 0
-        #
-        files = [
-            item.split(posixpath.sep)[-1] for item in self.loader.storage_files
-            if item.split(posixpath.sep)[-1] and
-            len(item.split(posixpath.sep)) == components + 1
-        ]
-        dirs = [
-            item.split(posixpath.sep)[-2] for item in self.loader.storage_files
-            if not item.split(posixpath.sep)[-1] and
-            len(item.split(posixpath.sep)) == components + 2
-        ]
-        #
-        return files + dirs
+        return self.loader.list_directory(path)
 
 
 class DataModuleResourceReader(ResourceReader):
@@ -1249,17 +1602,4 @@ class DataModuleResourceReader(ResourceReader):
         if os.sep != posixpath.sep:
             path = path.replace(os.sep, posixpath.sep)
         #
-        components = len(path.split(posixpath.sep)) if path else 0
-        #
-        files = [
-            item.split(posixpath.sep)[-1] for item in self.loader.storage_files
-            if item.split(posixpath.sep)[-1] and
-            len(item.split(posixpath.sep)) == components + 1
-        ]
-        dirs = [
-            item.split(posixpath.sep)[-2] for item in self.loader.storage_files
-            if not item.split(posixpath.sep)[-1] and
-            len(item.split(posixpath.sep)) == components + 2
-        ]
-        #
-        return files + dirs
+        return self.loader.list_directory(path)
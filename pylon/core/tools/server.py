@@ -23,6 +23,7 @@
 import os
 import signal
 
+import jinja2  # pylint: disable=E0401
 import socketio  # pylint: disable=E0401
 
 from gevent.pywsgi import WSGIServer  # pylint: disable=E0401,C0412
@@ -38,9 +39,7 @@ from pylon.core.tools import env
 
 def add_url_prefix(context):
     """ Add global URL prefix to context """
-    context.url_prefix = context.settings.get("server", dict()).get("path", "/")
-    while context.url_prefix.endswith("/"):
-        context.url_prefix = context.url_prefix[:-1]
+    context.url_prefix = context.settings.get("server", dict()).get("path", "/").rstrip("/")
 
 
 def add_middlewares(context):
@@ -67,6 +66,20 @@ def add_middlewares(context):
         )
 
 
+def add_template_cache(context):
+    """ Enable Jinja2 bytecode cache if requested """
+    cache_path = context.settings.get("server", dict()).get("template_cache_path", None)
+    if cache_path is None:
+        return
+    #
+    os.makedirs(cache_path, exist_ok=True)
+    # Must be set before app.jinja_env is created on first use
+    context.app.jinja_options = {
+        **context.app.jinja_options,
+        "bytecode_cache": jinja2.FileSystemBytecodeCache(cache_path),
+    }
+
+
 def noop_app(environ, start_response):
     """ Dummy app that always returns 404 """
     _ = environ
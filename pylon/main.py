@@ -114,6 +114,8 @@ def main():  # pylint: disable=R0912,R0914,R0915
     context.sio = server.create_socketio_instance(context)
     # Add dispatcher and proxy middlewares if needed
     server.add_middlewares(context)
+    # Enable template bytecode cache if needed
+    server.add_template_cache(context)
     # Set application settings
     context.app.config["CONTEXT"] = context
     context.app.config.from_mapping(context.settings.get("application", dict()))
@@ -0,0 +1,55 @@
+#!/usr/bin/python3
+# coding=utf-8
+
+#   Copyright 2021 getcarrier.io
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Tests: config tools """
+
+from pylon.core.tools.config import config_has_markers, config_substitution
+
+
+def test_no_markers():
+    assert not config_has_markers({
+        "url": "http://host/$path",
+        "items": ["a", 1, None, {"b": "c$!d"}],
+        "flag": True,
+    })
+
+
+def test_env_marker_in_nested_value():
+    assert config_has_markers({"a": [{"b": " $!HOME "}]})
+
+
+def test_secret_marker_in_key():
+    assert config_has_markers({"$=secret_key": "value"})
+
+
+def test_marker_filter():
+    config = {"home": "$!HOME"}
+    #
+    assert config_has_markers(config, ("$!",))
+    assert not config_has_markers(config, ("$=",))
+
+
+def test_markers_match_substitution(monkeypatch):
+    monkeypatch.setenv("PYLON_TEST_VALUE", "substituted")
+    #
+    config = {"value": "$!PYLON_TEST_VALUE", "secret": "$=token"}
+    #
+    assert config_has_markers(config)
+    assert config_substitution(config, {"token": "secret"}) == {
+        "value": "substituted",
+        "secret": "secret",
+    }
@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+# coding=utf-8
+
+#   Copyright 2021 getcarrier.io
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Tests: dependency tools """
+
+import pytest
+
+from pylon.core.tools import dependency
+
+
+def make_module_map(depencies):
+    """ Make module map (module_name -> (metadata, loader)) from depends_on lists """
+    return {
+        module_name: ({"depends_on": depends_on}, None)
+        for module_name, depends_on in depencies.items()
+    }
+
+
+def test_levels_follow_depencies():
+    module_map = make_module_map({
+        "app": ["auth", "db"],
+        "auth": ["db"],
+        "db": [],
+        "theme": [],
+    })
+    #
+    assert dependency.resolve_depencies_levels(module_map) == [
+        ["db", "theme"],
+        ["auth"],
+        ["app"],
+    ]
+
+
+def test_levels_use_optional_depencies_present_in_map():
+    module_map = {
+        "a": ({"init_after": ["b", "missing"]}, None),
+        "b": ({}, None),
+    }
+    #
+    assert dependency.resolve_depencies_levels(module_map) == [["b"], ["a"]]
+
+
+def test_levels_reject_self_dependency():
+    module_map = make_module_map({"a": ["a"]})
+    # Same as flat resolve: module depending on itself is a cycle
+    with pytest.raises(RuntimeError):
+        dependency.resolve_depencies(module_map)
+    with pytest.raises(RuntimeError):
+        dependency.resolve_depencies_levels(module_map)
+
+
+def test_levels_agree_with_flat_order():
+    module_map = make_module_map({
+        "e": ["d"],
+        "d": ["b", "c"],
+        "c": ["a"],
+        "b": ["a"],
+        "a": [],
+    })
+    #
+    module_order = dependency.resolve_depencies(module_map)
+    module_level = {
+        module_name: level
+        for level, module_names in enumerate(dependency.resolve_depencies_levels(module_map))
+        for module_name in module_names
+    }
+    #
+    assert sorted(module_order, key=module_level.get) == module_order
+
+
+def test_levels_detect_cycle():
+    module_map = make_module_map({
+        "a": ["b"],
+        "b": ["c"],
+        "c": ["a"],
+        "d": [],
+    })
+    #
+    with pytest.raises(RuntimeError):
+        dependency.resolve_depencies_levels(module_map)
@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+# coding=utf-8
+
+#   Copyright 2021 getcarrier.io
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+""" Tests: DataModuleLoader """
+
+import io
+import os
+import zipfile
+
+from pylon.core.tools.module import DataModuleLoader
+
+
+def make_module_data(members):
+    """ Make ZIP data from (name, data) pairs """
+    module_data = io.BytesIO()
+    with zipfile.ZipFile(module_data, "w") as module_zip:
+        for name, data in members:
+            module_zip.writestr(name, data)
+    return module_data.getvalue()
+
+
+def test_implicit_parent_directories():
+    loader = DataModuleLoader("plugins.test", make_module_data([
+        ("__init__.py", ""),
+        ("static/css/main.css", "body {}"),
+        ("templates/", ""),
+        ("templates/index.html", "<html/>"),
+    ]))
+    #
+    assert loader.has_directory("static")
+    assert loader.has_directory("static/css")
+    assert loader.has_directory("templates")
+    assert not loader.has_directory("static/css/main.css")
+    #
+    assert sorted(loader.list_directory("")) == ["__init__.py", "static", "templates"]
+    assert loader.list_directory("static") == ["css"]
+    assert loader.list_directory("static/css") == ["main.css"]
+    assert loader.list_directory("templates") == ["index.html"]
+
+
+def test_directory_listed_once():
+    loader = DataModuleLoader("plugins.test", make_module_data([
+        ("a/b.txt", "b"),
+        ("a/", ""),
+        ("a/c/d.txt", "d"),
+    ]))
+    #
+    assert loader.list_directory("") == ["a"]
+    assert sorted(loader.list_directory("a")) == ["b.txt", "c"]
+
+
+def test_extract_skips_members_outside_target(tmp_path):
+    loader = DataModuleLoader("plugins.test", make_module_data([
+        ("module/__init__.py", "VALUE = 1"),
+        ("module/empty/", ""),
+        ("../outside.txt", "outside"),
+        ("/absolute.txt", "absolute"),
+        ("module/../../escape.txt", "escape"),
+    ]))
+    target_path = tmp_path / "target"
+    target_path.mkdir()
+    #
+    loader.extract(str(target_path))
+    #
+    assert (target_path / "module" / "__init__.py").read_text() == "VALUE = 1"
+    assert (target_path / "module" / "empty").is_dir()
+    assert sorted(os.listdir(tmp_path)) == ["target"]
+    assert sorted(os.listdir(target_path)) == ["module"]
+    assert not os.path.exists("/absolute.txt")